@@ -0,0 +1,9 @@
+from telegram_movie_tracker.settings import init_django
+
+
+if __name__ == '__main__':
+    init_django()
+
+    from telegram_movie_tracker.main import main
+
+    main()
@@ -1,9 +1,6 @@
 from django.db import models
 
 from telegram_movie_tracker.db.managers import MovieManager, TVShowManager
-from telegram_movie_tracker.settings import init_django
-
-init_django()
 
 
 class User(models.Model):
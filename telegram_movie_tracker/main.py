@@ -11,7 +11,7 @@ from typing import Any
 import requests
 from asgiref.sync import sync_to_async
 from django.db.models import QuerySet
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram import Bot, Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters, \
     CallbackQueryHandler, ConversationHandler
 from tmdbsimple import Movies, TV
@@ -19,7 +19,9 @@ from tmdbsimple.find import Find
 from tmdbsimple.search import Search
 
 from telegram_movie_tracker.db.models import User, Movie, TVShow
-from telegram_movie_tracker.settings import env
+from telegram_movie_tracker.profiling import IMAGE, Profiler, TimedHTTPXRequest, install_timers, \
+    start_profiler, stop_profiler, timed
+from telegram_movie_tracker.settings import env, init_tmdb
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -28,6 +30,14 @@ logging.basicConfig(
 
 IMAGE_URL_PREFIX = 'https://image.tmdb.org/t/p/w500'
 CHARACTER_LIMIT = 4096
+PROFILE_TOP_N = 15
+MAX_PROFILE_SECONDS = 300
+PROFILE_USAGE = (
+    "Usage:\n"
+    "/profile [dry-run] [top_n]\n"
+    "/profile releases [top_n]\n"
+    f"/profile handlers {{seconds <= {MAX_PROFILE_SECONDS}}} [top_n]"
+)
 
 
 class TrackState(Enum):
@@ -57,7 +67,8 @@ def button_markup(buttons: [str, Any]) -> InlineKeyboardMarkup:
 
 def get_image(image_path: str) -> bytes:
     """Get image from TMDB image path"""
-    return requests.get(IMAGE_URL_PREFIX + image_path, stream=True).content
+    with timed(IMAGE):
+        return requests.get(IMAGE_URL_PREFIX + image_path, stream=True).content
 
 
 @sync_to_async
@@ -297,8 +308,8 @@ async def help_handler(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 @sync_to_async
-def get_movie_releases() -> list[Release]:
-    """Get new movie releases. Released movies are deleted from the database."""
+def get_movie_releases(dry_run: bool = False) -> list[Release]:
+    """Get new movie releases. Released movies are deleted from the database unless dry_run is set."""
     releases: list[Release] = []
     for movie in Movie.objects.all():
         movie_info = Movies(movie.id).info()
@@ -309,13 +320,14 @@ def get_movie_releases() -> list[Release]:
                 poster_path = str(movie_info['poster_path'])
             for user in movie.users.all():
                 releases.append(Release(user, caption, poster_path))
-            movie.delete()
+            if not dry_run:
+                movie.delete()
     return releases
 
 
 @sync_to_async
-def get_tv_show_releases() -> list[Release]:
-    """Get new tv show episode releases"""
+def get_tv_show_releases(dry_run: bool = False) -> list[Release]:
+    """Get new tv show episode releases. Last episodes are saved unless dry_run is set."""
     releases: list[Release] = []
     for tv_show in TVShow.objects.all():
         tv_show_info = TV(tv_show.id).info()
@@ -325,7 +337,8 @@ def get_tv_show_releases() -> list[Release]:
             if last_episode_info['season_number'] > tv_show.last_season:
                 tv_show.last_season = last_episode_info['season_number']
                 tv_show.last_episode = last_episode_info['episode_number']
-                tv_show.save()
+                if not dry_run:
+                    tv_show.save()
                 caption = f"{tv_show.title} Season {tv_show.last_season} was released.\n" \
                           f"{tv_show.last_episode} episode(s) available"
                 for season_info in tv_show_info['seasons']:
@@ -335,7 +348,8 @@ def get_tv_show_releases() -> list[Release]:
                         break
             elif last_episode_info['episode_number'] > tv_show.last_episode:
                 tv_show.last_episode = last_episode_info['episode_number']
-                tv_show.save()
+                if not dry_run:
+                    tv_show.save()
                 caption = f"{tv_show.title} Season {tv_show.last_season} Episode " \
                           f"{tv_show.last_episode} was released"
                 if 'still_path' in last_episode_info:
@@ -347,23 +361,112 @@ def get_tv_show_releases() -> list[Release]:
     return releases
 
 
-async def send_releases(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Send info about new releases to users tracking them"""
-    for release in itertools.chain(await get_movie_releases(), await get_tv_show_releases()):
+async def send_release_notifications(bot: Bot | None, dry_run: bool = False) -> None:
+    """Send info about new releases to users tracking them.
+
+    With dry_run set, images are downloaded but nothing is sent or written to the database.
+    The bot is not used in a dry run and may be None.
+    """
+    releases = itertools.chain(await get_movie_releases(dry_run), await get_tv_show_releases(dry_run))
+    for release in releases:
         if release.image_path != '':
             image = get_image(release.image_path)
-            await context.bot.send_photo(
+            if dry_run:
+                continue
+            await bot.send_photo(
                 chat_id=release.user.id,
                 photo=image,
                 caption=release.caption
             )
-        else:
-            await context.bot.send_message(
+        elif not dry_run:
+            await bot.send_message(
                 chat_id=release.user.id,
                 text=release.caption
             )
 
 
+async def send_releases(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Daily job for sending new releases"""
+    await send_release_notifications(context.bot)
+
+
+def parse_profile_args(args: list[str]) -> tuple[str, int | None, int]:
+    """Parse /profile arguments into (target, seconds, top_n). Seconds are None for release scans."""
+    if not args or args[0] not in ('dry-run', 'releases', 'handlers'):
+        args = ['dry-run', *args]
+    target = args[0]
+    if target == 'handlers':
+        if len(args) not in (2, 3):
+            raise ValueError("Wrong number of arguments")
+        seconds = int(args[1])
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            raise ValueError(f"Seconds must be between 1 and {MAX_PROFILE_SECONDS}")
+        top_n = int(args[2]) if len(args) > 2 else PROFILE_TOP_N
+    else:
+        if len(args) > 2:
+            raise ValueError("Wrong number of arguments")
+        seconds = None
+        top_n = int(args[1]) if len(args) > 1 else PROFILE_TOP_N
+    if top_n <= 0:
+        raise ValueError("top_n must be positive")
+    return target, seconds, top_n
+
+
+async def profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Profile one release scan or live handlers for the given number of seconds.
+
+    A real scan sends releases to users and updates the database, so the next daily job
+    will not send them again. A dry run does neither.
+    """
+    try:
+        target, seconds, top_n = parse_profile_args(context.args)
+    except ValueError:
+        await update.message.reply_text(PROFILE_USAGE)
+        return
+
+    try:
+        start_profiler({
+            'dry-run': 'release scan dry run', 'releases': 'release scan', 'handlers': 'handlers'
+        }[target])
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return
+
+    if seconds is not None:
+        context.job_queue.run_once(profile_finish, seconds, data=top_n)
+        await update.message.reply_text(f"Profiling handlers for {seconds} s")
+    else:
+        context.job_queue.run_once(profile_release_scan, 0, data=(target == 'dry-run', top_n))
+        await update.message.reply_text("Profiling release scan")
+
+
+async def profile_release_scan(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Run one release scan as a job under the running profiler and send the report.
+
+    The report is also sent if the scan fails.
+    """
+    dry_run, top_n = context.job.data
+    try:
+        await send_release_notifications(context.bot, dry_run)
+    finally:
+        await send_profile_report(context.bot, stop_profiler(), top_n)
+
+
+async def profile_finish(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Stop profiling handlers and send the report"""
+    await send_profile_report(context.bot, stop_profiler(), context.job.data)
+
+
+async def send_profile_report(bot: Bot, profiler: Profiler, top_n: int) -> None:
+    """Save the full profile and send a short report to the dev chat"""
+    path = profiler.save(env('PROFILE_DIR', default='profiles'))
+    message = f"{profiler.report(top_n)}\nFull profile: {path}"
+    for msg in range(0, len(message), CHARACTER_LIMIT):
+        await bot.send_message(
+            chat_id=env('DEV_CHAT_ID'), text=message[msg:msg + CHARACTER_LIMIT]
+        )
+
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log the error and send a telegram message to the dev chat"""
     logging.error("Exception while handling an update:", exc_info=context.error)
@@ -395,9 +498,12 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
 
 
 def main() -> None:
+    init_tmdb()
+    install_timers()
     application = (
         ApplicationBuilder()
         .token(env('BOT_TOKEN'))
+        .request(TimedHTTPXRequest(connection_pool_size=256))
         .arbitrary_callback_data(True)
         .build()
     )
@@ -441,6 +547,9 @@ def main() -> None:
     application.add_handler(stop_handler)
     application.add_handler(CommandHandler('shows', shows_handler))
     application.add_handler(CommandHandler('help', help_handler))
+    application.add_handler(CommandHandler(
+        'profile', profile_handler, filters=filters.Chat(chat_id=env.int('DEV_CHAT_ID'))
+    ))
     application.add_handler(MessageHandler(
         filters.COMMAND,
         callback=lambda update, _: update.message.reply_text("Unknown command, see /help")
@@ -454,7 +563,3 @@ def main() -> None:
     application.job_queue.run_daily(send_releases, time(hour=16, minute=0))
 
     application.run_polling()
-
-
-if __name__ == '__main__':
-    main()
@@ -0,0 +1,45 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+from telegram import Bot
+
+from telegram_movie_tracker.main import PROFILE_TOP_N, send_release_notifications
+from telegram_movie_tracker.profiling import TimedHTTPXRequest, install_timers, start_profiler, stop_profiler
+from telegram_movie_tracker.settings import env, init_tmdb
+
+
+class Command(BaseCommand):
+    help = "Run one release scan under the profiler and save the full profile. " \
+           "Without --dry-run this sends releases to users and updates the database, " \
+           "so the next daily job will not send them again."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--top', type=int, default=PROFILE_TOP_N, help="Number of functions in the report")
+        parser.add_argument('--output-dir', default=env('PROFILE_DIR', default='profiles'),
+                            help="Directory for the full profile")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Don't send releases or write to the database. No BOT_TOKEN is needed.")
+
+    def handle(self, *args, **options) -> None:
+        init_tmdb()
+        install_timers()
+        asyncio.run(self.scan(options['dry_run'], options['top'], options['output_dir']))
+
+    async def scan(self, dry_run: bool, top_n: int, output_dir: str) -> None:
+        if dry_run:
+            await self.profile(None, top_n, output_dir)
+            return
+        # The bot is initialised outside the profile, so getMe isn't counted as Bot API time
+        async with Bot(env('BOT_TOKEN'), request=TimedHTTPXRequest()) as bot:
+            await self.profile(bot, top_n, output_dir)
+
+    async def profile(self, bot: Bot | None, top_n: int, output_dir: str) -> None:
+        """Profile one release scan. Without a bot the scan is a dry run."""
+        profiler = start_profiler('release scan dry run' if bot is None else 'release scan')
+        try:
+            await send_release_notifications(bot, dry_run=bot is None)
+        finally:
+            stop_profiler()
+            path = profiler.save(output_dir)
+            self.stdout.write(profiler.report(top_n))
+            self.stdout.write(f"Full profile: {path}")
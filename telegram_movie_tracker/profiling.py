@@ -0,0 +1,196 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import requests
+import tmdbsimple as tmdb
+from django.db import connections
+from django.db.backends.signals import connection_created
+from telegram.request import HTTPXRequest
+
+TMDB = 'TMDB'
+DB = 'DB'
+IMAGE = 'Image download'
+BOT_API = 'Bot API'
+CATEGORIES = (TMDB, DB, IMAGE, BOT_API)
+
+SAMPLE_INTERVAL = 0.005
+# Leaf frames of threads waiting for work, excluded from samples
+IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('thread.py', '_worker'),
+}
+
+_active: 'Profiler | None' = None
+
+
+class Profiler:
+    """Wall-clock sampling profiler of all threads.
+
+    Stacks of all threads are sampled every SAMPLE_INTERVAL seconds.
+    Time spent in TMDB, database, image download and Bot API calls
+    is measured separately, see timed().
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.category_times = dict.fromkeys(CATEGORIES, 0.0)
+        self.category_calls = dict.fromkeys(CATEGORIES, 0)
+        self.started_at = datetime.now()
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+
+    def start(self) -> None:
+        self._start_time = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self.wall_time = time.perf_counter() - self._start_time
+
+    def add_time(self, category: str, elapsed: float) -> None:
+        with self._lock:
+            self.category_times[category] += elapsed
+            self.category_calls[category] += 1
+
+    def _sample_loop(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[tuple(reversed(stack))] += 1
+
+    def save(self, directory: str) -> Path:
+        """Save samples in the collapsed stack format used by flame graph tools"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        path /= f"{self.name.replace(' ', '-')}-{self.started_at:%Y%m%d-%H%M%S}.txt"
+        with path.open('w') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+        return path
+
+    def report(self, top_n: int) -> str:
+        """Get a summary with time per category and top functions by own samples"""
+        total = sum(self.samples.values())
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for function in set(stack[1:]):
+                inclusive[function] += count
+
+        result = f"Profile: {self.name}\n" \
+                 f"Wall time: {self.wall_time:.2f} s, {total} samples\n"
+        for category in CATEGORIES:
+            result += f"{category}: {self.category_times[category]:.2f} s " \
+                      f"({self.category_calls[category]} calls)\n"
+        if total == 0:
+            return result
+        result += f"Top {top_n} functions (own %, total %):\n"
+        for function, count in own.most_common(top_n):
+            name, location = function.split(' (', 1)
+            location = os.path.basename(location.rstrip(')'))
+            result += f"{100 * count / total:5.1f} {100 * inclusive[function] / total:5.1f} " \
+                      f"{name} ({location})\n"
+        return result
+
+
+def start_profiler(name: str) -> Profiler:
+    """Start a new profiler. Only one profiler can run at a time."""
+    global _active
+    if _active is not None:
+        raise ValueError(f"Already profiling {_active.name}")
+    _active = Profiler(name)
+    _active.start()
+    return _active
+
+
+def stop_profiler() -> Profiler:
+    """Stop the running profiler and return it"""
+    global _active
+    if _active is None:
+        raise ValueError("Not profiling anything")
+    profiler, _active = _active, None
+    profiler.stop()
+    return profiler
+
+
+@contextmanager
+def timed(category: str) -> Iterator[None]:
+    """Add time spent in the block to the category of the running profiler"""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add_time(category, time.perf_counter() - start)
+
+
+class TimedSession(requests.Session):
+    """Requests session measuring time of requests as TMDB time"""
+
+    def request(self, *args, **kwargs) -> requests.Response:
+        with timed(TMDB):
+            return super().request(*args, **kwargs)
+
+
+class TimedHTTPXRequest(HTTPXRequest):
+    """Telegram request class measuring time of requests as Bot API time"""
+
+    async def do_request(self, *args, **kwargs) -> tuple[int, bytes]:
+        with timed(BOT_API):
+            return await super().do_request(*args, **kwargs)
+
+
+def _time_query(execute, sql, params, many, context):
+    with timed(DB):
+        return execute(sql, params, many, context)
+
+
+def _add_query_timer(connection, **_) -> None:
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def install_timers() -> None:
+    """Measure TMDB and database time. Bot API time requires TimedHTTPXRequest."""
+    tmdb.REQUESTS_SESSION = TimedSession()
+    connection_created.connect(_add_query_timer, dispatch_uid='profiling')
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(connection)
+
+
+def uninstall_timers() -> None:
+    """Undo install_timers()"""
+    if isinstance(tmdb.REQUESTS_SESSION, TimedSession):
+        tmdb.REQUESTS_SESSION = None
+    connection_created.disconnect(dispatch_uid='profiling')
+    for connection in connections.all(initialized_only=True):
+        if _time_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_time_query)
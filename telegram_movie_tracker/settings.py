@@ -6,32 +6,53 @@ from django.conf import settings
 env = environ.Env()
 env.read_env()
 
-tmdb.API_KEY = env('API_KEY')
-
 INSTALLED_APPS = [
     'telegram_movie_tracker',
     'telegram_movie_tracker.db'
 ]
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': env('DB_NAME'),
-        'USER': env('DB_USER'),
-        'PASSWORD': env('DB_PASSWORD'),
-        'HOST': env('DB_HOST'),
-        'PORT': env('DB_PORT'),
+
+def get_databases() -> dict:
+    """Build the DATABASES setting from environment variables.
+
+    DB_ENGINE selects the backend: 'postgresql' (default) or 'sqlite'.
+    For SQLite, DB_NAME is a file path. It defaults to an in-memory database,
+    which is only usable in tests since each connection gets its own database.
+    """
+    if env('DB_ENGINE', default='postgresql') == 'sqlite':
+        return {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': env('DB_NAME', default=':memory:'),
+            }
+        }
+    return {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('DB_NAME'),
+            'USER': env('DB_USER'),
+            'PASSWORD': env('DB_PASSWORD'),
+            'HOST': env('DB_HOST'),
+            'PORT': env('DB_PORT'),
+        }
     }
-}
+
+
+def init_tmdb() -> None:
+    """Set the TMDB API key"""
+    tmdb.API_KEY = env('API_KEY')
 
 
 def init_django() -> None:
-    """Connect to database and setup Django ORM"""
+    """Connect to database and setup Django ORM.
+
+    Must be called before importing telegram_movie_tracker.db.models.
+    """
     if settings.configured:
         return
 
     settings.configure(
         INSTALLED_APPS=INSTALLED_APPS,
-        DATABASES=DATABASES
+        DATABASES=get_databases()
     )
     django.setup()
@@ -0,0 +1,152 @@
+import tempfile
+import time
+from pathlib import Path
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import tmdbsimple as tmdb
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, TestCase
+
+from telegram_movie_tracker.db.models import User, Movie, TVShow
+from telegram_movie_tracker.main import MAX_PROFILE_SECONDS, PROFILE_TOP_N, parse_profile_args, \
+    send_release_notifications
+from telegram_movie_tracker.profiling import CATEGORIES, DB, IMAGE, install_timers, start_profiler, \
+    stop_profiler, timed, uninstall_timers
+
+
+class ProfilerTestCase(TestCase):
+    def tearDown(self) -> None:
+        try:
+            stop_profiler()
+        except ValueError:
+            pass
+
+    def test_start_stop(self) -> None:
+        with self.assertRaises(ValueError):
+            stop_profiler()
+
+        profiler = start_profiler('test')
+        with self.assertRaises(ValueError):
+            start_profiler('test')
+        self.assertIs(profiler, stop_profiler())
+
+    def test_timed(self) -> None:
+        with timed(IMAGE):
+            pass
+
+        profiler = start_profiler('test')
+        with timed(IMAGE):
+            time.sleep(0.01)
+        stop_profiler()
+        with timed(IMAGE):
+            pass
+        self.assertEqual(1, profiler.category_calls[IMAGE])
+        self.assertGreaterEqual(profiler.category_times[IMAGE], 0.01)
+
+    def test_db_time(self) -> None:
+        install_timers()
+        self.addCleanup(uninstall_timers)
+        profiler = start_profiler('test')
+        User.objects.create(id=1)  # type: ignore
+        stop_profiler()
+        self.assertGreaterEqual(profiler.category_calls[DB], 1)
+
+    def test_uninstall_timers(self) -> None:
+        install_timers()
+        self.addCleanup(uninstall_timers)
+        self.assertEqual(1, len(connection.execute_wrappers))
+        uninstall_timers()
+        self.assertIsNone(tmdb.REQUESTS_SESSION)
+        self.assertFalse(connection_created.has_listeners())
+        self.assertEqual([], connection.execute_wrappers)
+
+    def test_report_and_save(self) -> None:
+        profiler = start_profiler('test run')
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+        stop_profiler()
+        self.assertGreater(sum(profiler.samples.values()), 0)
+
+        report = profiler.report(5)
+        for category in CATEGORIES:
+            self.assertIn(category, report)
+        self.assertIn('test_report_and_save', report)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = profiler.save(directory)
+            self.assertEqual(Path(directory), path.parent)
+            self.assertTrue(path.name.startswith('test-run-'))
+            lines = path.read_text().splitlines()
+            self.assertEqual(len(profiler.samples), len(lines))
+            self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+
+class ProfileArgsTestCase(SimpleTestCase):
+    def test_release_scan(self) -> None:
+        self.assertEqual(('dry-run', None, PROFILE_TOP_N), parse_profile_args([]))
+        self.assertEqual(('dry-run', None, 5), parse_profile_args(['dry-run', '5']))
+        self.assertEqual(('dry-run', None, 10), parse_profile_args(['10']))
+        self.assertEqual(('releases', None, PROFILE_TOP_N), parse_profile_args(['releases']))
+        self.assertEqual(('releases', None, 5), parse_profile_args(['releases', '5']))
+
+    def test_handlers(self) -> None:
+        self.assertEqual(('handlers', 30, PROFILE_TOP_N), parse_profile_args(['handlers', '30']))
+        self.assertEqual(
+            ('handlers', MAX_PROFILE_SECONDS, 5),
+            parse_profile_args(['handlers', str(MAX_PROFILE_SECONDS), '5'])
+        )
+
+    def test_invalid(self) -> None:
+        invalid_args = [
+            ['handlers'],
+            ['handlers', 'x'],
+            ['handlers', '0'],
+            ['handlers', '-30'],
+            ['handlers', str(MAX_PROFILE_SECONDS + 1)],
+            ['handlers', '30', '0'],
+            ['handlers', '30', '5', '1'],
+            ['releases', '-1'],
+            ['releases', '5', '1'],
+            ['dry-run', 'x'],
+            ['-1'],
+            ['10', '5'],
+            ['unknown'],
+        ]
+        for args in invalid_args:
+            with self.subTest(args=args), self.assertRaises(ValueError):
+                parse_profile_args(args)
+
+
+@patch('telegram_movie_tracker.main.requests.get', Mock(return_value=Mock(content=b'image')))
+@patch('telegram_movie_tracker.main.TV.info', Mock(return_value={
+    'last_episode_to_air': {'season_number': 1, 'episode_number': 2, 'still_path': '/still.jpg'}
+}))
+@patch('telegram_movie_tracker.main.Movies.info', Mock(return_value={
+    'status': 'Released', 'poster_path': '/poster.jpg'
+}))
+class ReleaseScanTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        user = User.objects.create(id=1)  # type: ignore
+        Movie.objects.create(id=1, title='movie').users.add(user)
+        TVShow.objects.create(id=2, title='tv show', last_season=1, last_episode=1).users.add(user)
+
+    async def test_dry_run(self) -> None:
+        bot = AsyncMock()
+        await send_release_notifications(bot, dry_run=True)
+        self.assertEqual([], bot.mock_calls)
+        self.assertTrue(await sync_to_async(Movie.objects.filter(id=1).exists)())
+        tv_show = await sync_to_async(TVShow.objects.get)(id=2)
+        self.assertEqual(1, tv_show.last_episode)
+
+    async def test_release_scan(self) -> None:
+        bot = AsyncMock()
+        await send_release_notifications(bot)
+        self.assertEqual(2, bot.send_photo.await_count)
+        self.assertFalse(await sync_to_async(Movie.objects.filter(id=1).exists)())
+        tv_show = await sync_to_async(TVShow.objects.get)(id=2)
+        self.assertEqual(2, tv_show.last_episode)